@@ -1,12 +1,18 @@
 from __future__ import absolute_import, print_function, unicode_literals
 
 import collections
+import io
 import os
 import requests
 import warnings
 import logging
 import platform
+import threading
 
+from multiprocessing.pool import ThreadPool
+
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
 from six import raise_from
 from six.moves.urllib.parse import quote
 
@@ -14,7 +20,7 @@ from six.moves.urllib.parse import quote
 from .errors import *
 from .requests_ext import stream_multipart, NullAuth
 
-from .utils import compute_hash, jencode, pv
+from .utils import compute_hash, jdecode, jencode, jloads, pv
 from .utils.http_codes import STATUS_CODES
 
 from .mixins.organizations import OrgMixin
@@ -30,6 +36,89 @@ from ._version import get_versions
 __version__ = get_versions()['version']
 del get_versions
 
+CLIENT_VERSION = pv(__version__)
+
+# Parsed versions of the api servers seen so far, they rarely vary between responses
+_API_VERSIONS = {}
+
+# Status codes accepted by `Binstar._check_response` when none are given
+DEFAULT_ALLOWED = frozenset([200])
+
+# Errors raised by `Binstar._check_response` for specific status codes
+ERROR_CLASSES = {
+    401: errors.Unauthorized,
+    404: errors.NotFound,
+    409: errors.Conflict,
+}
+
+# URL templates of the endpoints used by more than one method
+PACKAGE_URL = '%s/package/%s/%s'
+COLLABORATOR_URL = '%s/packages/%s/%s/collaborators/%s'
+RELEASE_URL = '%s/release/%s/%s/%s'
+DIST_URL = '%s/dist/%s/%s/%s/%s'
+
+# Size of the connection pool kept per host by every session
+POOL_SIZE = 32
+# Maximum number of concurrent requests issued by the batch helpers
+MAX_WORKERS = 16
+# Maximum number of responses kept for ETag revalidation, oldest are dropped first
+ETAG_CACHE_SIZE = 256
+
+
+def _mount_adapter(session):
+    '''
+    Mount an adapter with a larger connection pool, which also retries
+    idempotent requests on connection errors and gateway failures.
+
+    The Retry-After header is ignored, so a maintenance 503 asking to come
+    back in an hour only gets the short backoff instead of blocking the client.
+    '''
+    retries = Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                    raise_on_status=False, respect_retry_after_header=False)
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE,
+                          pool_block=False, max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+
+def _parse_api_version(api_version):
+    if api_version not in _API_VERSIONS:
+        _API_VERSIONS[api_version] = pv(api_version)
+    return _API_VERSIONS[api_version]
+
+
+def _hashable(params):
+    '''
+    Turn the `params` or `data` of a request into something usable as a key
+    '''
+    if not params:
+        return None
+    if not isinstance(params, dict):
+        return params
+    return tuple(sorted(
+        (name, tuple(value) if isinstance(value, list) else value)
+        for name, value in params.items()
+    ))
+
+
+def _fan_out(func, args_list, max_workers=MAX_WORKERS):
+    '''
+    Call `func(*args)` for every item of `args_list` using a pool of threads,
+    so the round trips of independent requests overlap.
+
+    :returns: the results in the same order as `args_list`
+    '''
+    args_list = [tuple(args) for args in args_list]
+    if len(args_list) < 2:
+        return [func(*args) for args in args_list]
+
+    pool = ThreadPool(min(max_workers, len(args_list)))
+    try:
+        return pool.map(lambda args: func(*args), args_list)
+    finally:
+        pool.close()
+        pool.join()
+
 
 class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
     """
@@ -41,6 +130,11 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
 
     def __init__(self, token=None, domain='https://api.anaconda.org', verify=True, **kwargs):
         self._session = requests.Session()
+        _mount_adapter(self._session)
+        self._storage_session = None
+        self._hash_cache = {}
+        self._etag_cache = collections.OrderedDict()
+        self._etag_lock = threading.Lock()
         self._session.headers['x-binstar-api-version'] = __version__
         self.session.verify = verify
         self.session.auth = NullAuth()
@@ -55,7 +149,7 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         })
 
         if token:
-            self._session.headers.update({'Authorization': 'token {}'.format(token)})
+            self._session.headers['Authorization'] = 'token {}'.format(token)
 
         if domain.endswith('/'):
             domain = domain[:-1]
@@ -67,6 +161,21 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
     def session(self):
         return self._session
 
+    @property
+    def storage_session(self):
+        '''
+        A session without the custom headers of `session`, used to talk to the
+        storage backend (e.g. S3) so that uploads and redirected downloads reuse
+        their pooled connections.
+
+        Certificates are always verified on downloads, whatever the `verify`
+        setting of this client; uploads pass that setting explicitly.
+        '''
+        if self._storage_session is None:
+            self._storage_session = requests.Session()
+            _mount_adapter(self._storage_session)
+        return self._storage_session
+
     def check_server(self):
         """
         Checks if the server is reachable and throws
@@ -89,7 +198,7 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         res = self.session.get(url)
         try:
             self._check_response(res)
-            res = res.json()
+            res = jdecode(res)
             return res['authentication_type']
         except BinstarError:
             return 'password'
@@ -138,6 +247,7 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
                    'hostname': hostname,
                    'user': for_user,
                    'max-age': max_age,
+                   # `created_with` is the command line, which may contain the password
                    'created_with': None,
                    'strength': strength,
                    'fail-if-exists': fail_if_already_exists}
@@ -145,16 +255,17 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         data, headers = jencode(payload)
         res = self.session.post(url, auth=auth, data=data, headers=headers)
         self._check_response(res)
-        res = res.json()
+        res = jdecode(res)
         token = res['token']
-        self.session.headers.update({'Authorization': 'token %s' % (token)})
+        self._etag_cache.clear()
+        self.session.headers['Authorization'] = 'token %s' % (token)
         return token
 
     def list_scopes(self):
         url = '%s/scopes' % (self.domain)
-        res = requests.get(url)
+        res = self.session.get(url)
         self._check_response(res)
-        return res.json()
+        return jdecode(res)
 
     def authentication(self):
         '''
@@ -163,7 +274,7 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         url = '%s/authentication' % (self.domain)
         res = self.session.get(url)
         self._check_response(res)
-        return res.json()
+        return jdecode(res)
 
     def authentications(self):
         '''
@@ -173,7 +284,7 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         url = '%s/authentications' % (self.domain)
         res = self.session.get(url)
         self._check_response(res)
-        return res.json()
+        return jdecode(res)
 
     def remove_authentication(self, auth_name=None, organization=None):
         """
@@ -188,11 +299,11 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
             url = '%s/authentications' % (self.domain,)
 
         res = self.session.delete(url)
-        self._check_response(res, [201])
+        self._check_response(res, (201,))
 
-    def _check_response(self, res, allowed=[200]):
+    def _check_response(self, res, allowed=DEFAULT_ALLOWED):
         api_version = res.headers.get('x-binstar-api-version', '0.2.1')
-        if pv(api_version) > pv(__version__):
+        if api_version != __version__ and _parse_api_version(api_version) > CLIENT_VERSION:
             logger.warning('The api server is running the binstar-api version %s. you are using %s\nPlease update your '
                            'client with pip install -U binstar or conda update binstar' % (api_version, __version__))
 
@@ -206,28 +317,58 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         if 'X-Anaconda-Read-Only' in res.headers:
             logger.warning('Anaconda repository is currently in READ ONLY mode.')
 
-        if not res.status_code in allowed:
-            short, long = STATUS_CODES.get(res.status_code, ('?', 'Undefined error'))
-            msg = '%s: %s ([%s] %s -> %s)' % (short, long, res.request.method, res.request.url, res.status_code)
+        if res.status_code in allowed:
+            return
+
+        short, long = STATUS_CODES.get(res.status_code, ('?', 'Undefined error'))
+        msg = '%s: %s ([%s] %s -> %s)' % (short, long, res.request.method, res.request.url, res.status_code)
 
+        # Only try to decode the body if the server did not say it is something else
+        content_type = res.headers.get('Content-Type', 'application/json')
+        if content_type.startswith('application/json'):
             try:
-                data = res.json()
-            except:
+                data = jdecode(res)
+            except ValueError:
                 pass
             else:
-                msg = data.get('error', msg)
+                if isinstance(data, dict):
+                    msg = data.get('error', msg)
+
+        if res.status_code >= 500:
+            ErrCls = errors.ServerError
+        else:
+            ErrCls = ERROR_CLASSES.get(res.status_code, errors.BinstarError)
 
-            ErrCls = errors.BinstarError
-            if res.status_code == 401:
-                ErrCls = errors.Unauthorized
-            elif res.status_code == 404:
-                ErrCls = errors.NotFound
-            elif res.status_code == 409:
-                ErrCls = errors.Conflict
-            elif res.status_code >= 500:
-                ErrCls = errors.ServerError
+        raise ErrCls(msg, res.status_code)
 
-            raise ErrCls(msg, res.status_code)
+    def _get_json(self, url, **kwargs):
+        '''
+        GET `url` and return the decoded json response.
+
+        Responses carrying an ETag are remembered, and the next request to the
+        same url is sent with `If-None-Match` so the server can answer with a
+        304 (Not Modified) instead of the whole body.
+        '''
+        key = (url, _hashable(kwargs.get('params')), _hashable(kwargs.get('data')))
+        cached = self._etag_cache.get(key)
+
+        if cached is not None:
+            kwargs['headers'] = {'If-None-Match': cached[0]}
+
+        res = self.session.get(url, **kwargs)
+
+        if cached is not None and res.status_code == 304:
+            self._check_response(res, (304,))
+            return jloads(cached[1])
+
+        self._check_response(res)
+        if 'ETag' in res.headers:
+            with self._etag_lock:
+                self._etag_cache.pop(key, None)
+                self._etag_cache[key] = (res.headers['ETag'], res.content)
+                while len(self._etag_cache) > ETAG_CACHE_SIZE:
+                    self._etag_cache.popitem(last=False)
+        return jdecode(res)
 
     def user(self, login=None):
         '''
@@ -241,10 +382,7 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         else:
             url = '%s/user' % (self.domain)
 
-        res = self.session.get(url, verify=self.session.verify)
-        self._check_response(res)
-
-        return res.json()
+        return self._get_json(url)
 
     def user_packages(
             self,
@@ -285,10 +423,7 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         if access:
             arguments['access'] = access
 
-        res = self.session.get(url, params=arguments)
-        self._check_response(res)
-
-        return res.json()
+        return self._get_json(url, params=arguments)
 
     def package(self, login, package_name):
         '''
@@ -297,38 +432,41 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         :param login: the login of the package owner
         :param package_name: the name of the package
         '''
-        url = '%s/package/%s/%s' % (self.domain, login, package_name)
-        res = self.session.get(url)
-        self._check_response(res)
-        return res.json()
+        url = PACKAGE_URL % (self.domain, login, package_name)
+        return self._get_json(url)
+
+    def gather_packages(self, packages):
+        '''
+        Get information about several packages, fetching them concurrently
+
+        :param packages: an iterable of (login, package_name) pairs
+        :returns: a list of package information in the same order as `packages`
+        '''
+        return _fan_out(self.package, packages)
 
     def package_add_collaborator(self, owner, package_name, collaborator):
-        url = '%s/packages/%s/%s/collaborators/%s' % (self.domain, owner, package_name, collaborator)
+        url = COLLABORATOR_URL % (self.domain, owner, package_name, collaborator)
         res = self.session.put(url)
-        self._check_response(res, [201])
+        self._check_response(res, (201,))
         return
 
     def package_remove_collaborator(self, owner, package_name, collaborator):
-        url = '%s/packages/%s/%s/collaborators/%s' % (self.domain, owner, package_name, collaborator)
+        url = COLLABORATOR_URL % (self.domain, owner, package_name, collaborator)
         res = self.session.delete(url)
-        self._check_response(res, [201])
+        self._check_response(res, (201,))
         return
 
     def package_collaborators(self, owner, package_name):
 
         url = '%s/packages/%s/%s/collaborators' % (self.domain, owner, package_name)
-        res = self.session.get(url)
-        self._check_response(res, [200])
-        return res.json()
+        return self._get_json(url)
 
     def all_packages(self, modified_after=None):
         '''
         '''
         url = '%s/package_listing' % (self.domain)
         data = {'modified_after':modified_after or ''}
-        res = self.session.get(url, data=data)
-        self._check_response(res)
-        return res.json()
+        return self._get_json(url, data=data)
 
 
     def add_package(self, login, package_name,
@@ -351,7 +489,7 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         :param public: if true then the package will be hosted publicly
         :param attrs: A dictionary of extra attributes for this package
         '''
-        url = '%s/package/%s/%s' % (self.domain, login, package_name)
+        url = PACKAGE_URL % (self.domain, login, package_name)
 
         attrs = attrs or {}
         attrs['summary'] = summary
@@ -364,20 +502,20 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
 
         payload = dict(public=bool(public),
                        publish=False,
-                       public_attrs=dict(attrs or {})
+                       public_attrs=attrs,
                        )
 
         data, headers = jencode(payload)
         res = self.session.post(url, data=data, headers=headers)
         self._check_response(res)
-        return res.json()
+        return jdecode(res)
 
     def remove_package(self, username, package_name):
 
-        url = '%s/package/%s/%s' % (self.domain, username, package_name)
+        url = PACKAGE_URL % (self.domain, username, package_name)
 
         res = self.session.delete(url)
-        self._check_response(res, [201])
+        self._check_response(res, (201,))
         return
 
     def release(self, login, package_name, version):
@@ -388,10 +526,17 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         :param package_name: the name of the package
         :param version: the name of the package
         '''
-        url = '%s/release/%s/%s/%s' % (self.domain, login, package_name, version)
-        res = self.session.get(url)
-        self._check_response(res)
-        return res.json()
+        url = RELEASE_URL % (self.domain, login, package_name, version)
+        return self._get_json(url)
+
+    def gather_releases(self, releases):
+        '''
+        Get information about several releases, fetching them concurrently
+
+        :param releases: an iterable of (login, package_name, version) triples
+        :returns: a list of release information in the same order as `releases`
+        '''
+        return _fan_out(self.release, releases)
 
     def remove_release(self, username, package_name, version):
         '''
@@ -401,9 +546,9 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         :param package_name: the name of the package
         :param version: the name of the package
         '''
-        url = '%s/release/%s/%s/%s' % (self.domain, username, package_name, version)
+        url = RELEASE_URL % (self.domain, username, package_name, version)
         res = self.session.delete(url)
-        self._check_response(res, [201])
+        self._check_response(res, (201,))
         return
 
     def add_release(self, login, package_name, version, requirements, announce, release_attrs):
@@ -417,7 +562,7 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         :param announce: An announcement that will be posted to all package watchers
         '''
 
-        url = '%s/release/%s/%s/%s' % (self.domain, login, package_name, version)
+        url = RELEASE_URL % (self.domain, login, package_name, version)
 
         if not release_attrs:
             release_attrs = {}
@@ -432,20 +577,26 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         data, headers = jencode(payload)
         res = self.session.post(url, data=data, headers=headers)
         self._check_response(res)
-        return res.json()
+        return jdecode(res)
 
     def distribution(self, login, package_name, release, basename=None):
 
-        url = '%s/dist/%s/%s/%s/%s' % (self.domain, login, package_name, release, basename)
+        url = DIST_URL % (self.domain, login, package_name, release, basename)
+        return self._get_json(url)
 
-        res = self.session.get(url)
-        self._check_response(res)
-        return res.json()
+    def gather_distributions(self, distributions):
+        '''
+        Get information about several distributions, fetching them concurrently
+
+        :param distributions: an iterable of (login, package_name, release, basename) tuples
+        :returns: a list of distribution information in the same order as `distributions`
+        '''
+        return _fan_out(self.distribution, distributions)
 
     def remove_dist(self, login, package_name, release, basename=None, _id=None):
 
         if basename:
-            url = '%s/dist/%s/%s/%s/%s' % (self.domain, login, package_name, release, basename)
+            url = DIST_URL % (self.domain, login, package_name, release, basename)
         elif _id:
             url = '%s/dist/%s/%s/%s/-/%s' % (self.domain, login, package_name, release, _id)
         else:
@@ -453,7 +604,7 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
 
         res = self.session.delete(url)
         self._check_response(res)
-        return res.json()
+        return jdecode(res)
 
 
     def download(self, login, package_name, release, basename, md5=None):
@@ -477,7 +628,7 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
             headers = {}
 
         res = self.session.get(url, headers=headers, allow_redirects=False)
-        self._check_response(res, allowed=[200, 302, 304])
+        self._check_response(res, allowed=(200, 302, 304))
 
         if res.status_code == 200:
             # We received the content directly from anaconda.org
@@ -487,10 +638,9 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
             return None
         elif res.status_code == 302:
             # Download from s3:
-            # We need to create a new request (without using session) to avoid
-            # sending the custom headers set on our session to S3 (which causes
-            # a failure).
-            res2 = requests.get(res.headers['location'], stream=True)
+            # We need to use a separate session to avoid sending the custom
+            # headers set on our session to S3 (which causes a failure).
+            res2 = self.storage_session.get(res.headers['location'], stream=True)
             return res2
 
 
@@ -521,13 +671,13 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         data, headers = jencode(payload)
         res = self.session.post(url, data=data, headers=headers)
         self._check_response(res)
-        obj = res.json()
+        obj = jdecode(res)
 
         s3url = obj['post_url']
         s3data = obj['form_data']
 
         if md5 is None:
-            _hexmd5, b64md5, size = compute_hash(fd, size=size)
+            _hexmd5, b64md5, size = self._compute_hash(fd, size=size)
         elif size is None:
             spos = fd.tell()
             fd.seek(0, os.SEEK_END)
@@ -540,18 +690,22 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         data_stream, headers = stream_multipart(s3data, files={'file':(basename, fd)},
                                                 callback=callback)
 
-        request_method = self.session if s3url.startswith(self.domain) else requests
+        request_method = self.session if s3url.startswith(self.domain) else self.storage_session
+        # Only the status code is needed on success, so do not read the response body
         s3res = request_method.post(
-            s3url, data=data_stream,
+            s3url, data=data_stream, stream=True,
             verify=self.session.verify, timeout=10 * 60 * 60,
             headers=headers
         )
 
-        if s3res.status_code != 201:
-            logger.info(s3res.text)
-            logger.info('')
-            logger.info('')
-            raise errors.BinstarError('Error uploading package', s3res.status_code)
+        try:
+            if s3res.status_code != 201:
+                logger.info(s3res.text)
+                logger.info('')
+                logger.info('')
+                raise errors.BinstarError('Error uploading package', s3res.status_code)
+        finally:
+            s3res.close()
 
         url = '%s/commit/%s/%s/%s/%s' % (self.domain, login, package_name, release, quote(basename))
         payload = dict(dist_id=obj['dist_id'])
@@ -559,24 +713,41 @@ class Binstar(OrgMixin, ChannelsMixin, PackageMixin):
         res = self.session.post(url, data=data, headers=headers)
         self._check_response(res)
 
-        return res.json()
+        return jdecode(res)
+
+    def _compute_hash(self, fd, size=None):
+        '''
+        Same as `compute_hash`, but remembers the result for files on disk so
+        that uploading an unchanged file again does not read it twice.
+        '''
+        try:
+            stat = os.fstat(fd.fileno())
+            key = (os.path.abspath(fd.name), stat.st_mtime, stat.st_size, fd.tell(), size)
+        except (AttributeError, TypeError, OSError, io.UnsupportedOperation):
+            key = None
+
+        if key is not None and key in self._hash_cache:
+            return self._hash_cache[key]
+
+        result = compute_hash(fd, size=size)
+        if key is not None:
+            self._hash_cache[key] = result
+        return result
 
     def search(self, query, package_type=None, platform=None):
         url = '%s/search' % self.domain
-        res = self.session.get(url, params={
+        return self._get_json(url, params={
             'name': query,
             'type': package_type,
             'platform': platform,
         })
-        self._check_response(res)
-        return res.json()
 
     def user_licenses(self):
         """Download the user current trial/paid licenses."""
         url = '{domain}/license'.format(domain=self.domain)
         res = self.session.get(url)
         self._check_response(res)
-        return res.json()
+        return jdecode(res)
 
 
 from ._version import get_versions
@@ -4,7 +4,7 @@ Created on May 2, 2014
 @author: sean
 '''
 
-from binstar_client.utils import jencode
+from binstar_client.utils import jdecode, jencode
 from binstar_client.errors import BinstarError
 
 class ChannelsMixin(object):
@@ -16,8 +16,8 @@ class ChannelsMixin(object):
         url = '%s/channels/%s' % (self.domain, owner)
 
         res = self.session.get(url)
-        self._check_response(res, [200])
-        return res.json()
+        self._check_response(res, (200,))
+        return jdecode(res)
 
     def show_channel(self, channel, owner):
         '''List the channels for owner
@@ -26,8 +26,8 @@ class ChannelsMixin(object):
         url = '%s/channels/%s/%s' % (self.domain, owner, channel)
 
         res = self.session.get(url)
-        self._check_response(res, [200])
-        return res.json()
+        self._check_response(res, (200,))
+        return jdecode(res)
 
     def add_channel(self, channel, owner, package=None, version=None, filename=None):
         '''
@@ -44,7 +44,7 @@ class ChannelsMixin(object):
         data, headers = jencode(package=package, version=version, basename=filename)
 
         res = self.session.post(url, data=data, headers=headers)
-        self._check_response(res, [201])
+        self._check_response(res, (201,))
 
     def remove_channel(self, channel, owner, package=None, version=None, filename=None):
         '''
@@ -61,7 +61,7 @@ class ChannelsMixin(object):
         data, headers = jencode(package=package, version=version, basename=filename)
 
         res = self.session.delete(url, data=data, headers=headers)
-        self._check_response(res, [201])
+        self._check_response(res, (201,))
 
     def copy_channel(self, channel, owner, to_channel):
         '''
@@ -74,7 +74,7 @@ class ChannelsMixin(object):
         '''
         url = '%s/channels/%s/%s/copy/%s' % (self.domain, owner, channel, to_channel)
         res = self.session.post(url)
-        self._check_response(res, [201])
+        self._check_response(res, (201,))
 
     def lock_channel(self, channel, owner):
         '''
@@ -87,7 +87,7 @@ class ChannelsMixin(object):
         '''
         url = '%s/channels/%s/%s/lock' % (self.domain, owner, channel)
         res = self.session.post(url)
-        self._check_response(res, [201])
+        self._check_response(res, (201,))
 
     def unlock_channel(self, channel, owner):
         '''
@@ -100,5 +100,5 @@ class ChannelsMixin(object):
         '''
         url = '%s/channels/%s/%s/lock' % (self.domain, owner, channel)
         res = self.session.delete(url)
-        self._check_response(res, [201])
+        self._check_response(res, (201,))
 
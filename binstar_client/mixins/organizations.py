@@ -1,4 +1,4 @@
-from binstar_client.utils import jencode
+from binstar_client.utils import jdecode, jencode
 
 class OrgMixin(object):
 
@@ -12,7 +12,7 @@ class OrgMixin(object):
         res = self.session.get(url)
         self._check_response(res)
 
-        return res.json()
+        return jdecode(res)
 
     def groups(self, owner=None):
         if owner:
@@ -23,55 +23,55 @@ class OrgMixin(object):
         res = self.session.get(url)
         self._check_response(res)
 
-        return res.json()
+        return jdecode(res)
 
     def group(self, owner, group_name):
         url = '%s/group/%s/%s' % (self.domain, owner, group_name)
         res = self.session.get(url)
         self._check_response(res)
-        return res.json()
+        return jdecode(res)
 
     def group_members(self, org, name):
         url = '%s/group/%s/%s/members' % (self.domain, org, name)
         res = self.session.get(url)
         self._check_response(res)
 
-        return res.json()
+        return jdecode(res)
 
     def is_group_member(self, org, name, member):
         url = '%s/group/%s/%s/members/%s' % (self.domain, org, name, member)
         res = self.session.get(url)
-        self._check_response(res, [204, 404])
+        self._check_response(res, (204, 404))
         return res.status_code == 204
 
     def add_group_member(self, org, name, member):
         url = '%s/group/%s/%s/members/%s' % (self.domain, org, name, member)
         res = self.session.put(url)
-        self._check_response(res, [204])
+        self._check_response(res, (204,))
         return
 
     def remove_group_member(self, org, name, member):
         url = '%s/group/%s/%s/members/%s' % (self.domain, org, name, member)
         res = self.session.delete(url)
-        self._check_response(res, [204])
+        self._check_response(res, (204,))
         return
 
     def remove_group_package(self, org, name, package):
         url = '%s/group/%s/%s/packages/%s' % (self.domain, org, name, package)
         res = self.session.delete(url)
-        self._check_response(res, [204])
+        self._check_response(res, (204,))
         return
 
     def group_packages(self, org, name):
         url = '%s/group/%s/%s/packages' % (self.domain, org, name)
         res = self.session.get(url)
-        self._check_response(res, [200])
-        return res.json()
+        self._check_response(res, (200,))
+        return jdecode(res)
 
     def add_group_package(self, org, name, package):
         url = '%s/group/%s/%s/packages/%s' % (self.domain, org, name, package)
         res = self.session.put(url)
-        self._check_response(res, [204])
+        self._check_response(res, (204,))
         return
 
     def add_group(self, org, name, perms='read'):
@@ -81,7 +81,7 @@ class OrgMixin(object):
         data, headers = jencode(payload)
 
         res = self.session.post(url, data=data, headers=headers)
-        self._check_response(res, [204])
+        self._check_response(res, (204,))
 
         return
 
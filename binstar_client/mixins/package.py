@@ -3,7 +3,7 @@ Created on May 23, 2014
 
 @author: sean
 '''
-from binstar_client.utils import jencode
+from binstar_client.utils import jdecode, jencode
 
 class PackageMixin(object):
 
@@ -17,5 +17,5 @@ class PackageMixin(object):
         data, headers = jencode(payload)
         res = self.session.post(url, data=data, headers=headers)
         self._check_response(res)
-        return res.json()
+        return jdecode(res)
 
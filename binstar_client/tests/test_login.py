@@ -1,5 +1,6 @@
 from __future__ import unicode_literals
 # Standard library imports
+import json
 import unittest
 
 # Third party imports
@@ -67,6 +68,23 @@ class Test(CLITestCase):
         self.assertTrue(store_token.called)
         self.assertEqual(store_token.call_args[0][0], 'a-token')
 
+    @patch('binstar_client.commands.login.store_token')
+    @patch('binstar_client.commands.login.input')
+    @urlpatch
+    def test_login_password_not_sent(self, urls, input, store_token):
+        input.return_value = 'test_user'
+        argv = ['anaconda', 'login', '--password', 'secret-password']
+
+        urls.register(path='/', method='HEAD', status=200)
+        urls.register(path='/authentication-type', content='{"authentication_type": "password"}')
+
+        auth = urls.register(method='POST', path='/authentications', content='{"token": "a-token"}')
+        with patch('sys.argv', argv):
+            main(['--show-traceback'] + argv[1:], False)
+
+        auth.assertCalled()
+        self.assertIsNone(json.loads(auth.req.body)['created_with'])
+
     @unittest.skipIf(have_kerberos, "prompts user to install requests-kerberos")
     @urlpatch
     def test_login_kerberos_missing(self, urls):
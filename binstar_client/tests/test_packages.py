@@ -1,5 +1,7 @@
 import unittest
 
+from mock import patch
+
 from binstar_client.tests.urlmock import urlpatch
 from binstar_client import Binstar
 
@@ -33,6 +35,85 @@ class Test(unittest.TestCase):
         self.assertEqual(packages, [])
         urls.assertAllCalled()
 
+    @urlpatch
+    def test_gather_packages(self, urls):
+        api = Binstar()
+        urls.register(method='GET', path='/package/u1/foo', content='{"name": "foo"}')
+        urls.register(method='GET', path='/package/u2/bar', content='{"name": "bar"}')
+
+        packages = api.gather_packages([('u1', 'foo'), ('u2', 'bar')])
+
+        self.assertEqual(packages, [{'name': 'foo'}, {'name': 'bar'}])
+        urls.assertAllCalled()
+
+    @urlpatch
+    def test_gather_releases(self, urls):
+        api = Binstar()
+        urls.register(method='GET', path='/release/u1/foo/0.1', content='{"version": "0.1"}')
+        urls.register(method='GET', path='/release/u1/foo/0.2', content='{"version": "0.2"}')
+
+        releases = api.gather_releases([('u1', 'foo', '0.1'), ('u1', 'foo', '0.2')])
+
+        self.assertEqual(releases, [{'version': '0.1'}, {'version': '0.2'}])
+        urls.assertAllCalled()
+
+    @urlpatch
+    def test_gather_distributions(self, urls):
+        api = Binstar()
+        urls.register(method='GET', path='/dist/u1/foo/0.1/osx-64/foo-0.1-0.tar.bz2',
+                      content='{"basename": "osx-64/foo-0.1-0.tar.bz2"}')
+        urls.register(method='GET', path='/dist/u1/foo/0.1/linux-64/foo-0.1-0.tar.bz2',
+                      content='{"basename": "linux-64/foo-0.1-0.tar.bz2"}')
+
+        distributions = api.gather_distributions([
+            ('u1', 'foo', '0.1', 'osx-64/foo-0.1-0.tar.bz2'),
+            ('u1', 'foo', '0.1', 'linux-64/foo-0.1-0.tar.bz2'),
+        ])
+
+        self.assertEqual(distributions, [
+            {'basename': 'osx-64/foo-0.1-0.tar.bz2'},
+            {'basename': 'linux-64/foo-0.1-0.tar.bz2'},
+        ])
+        urls.assertAllCalled()
+
+    @urlpatch
+    def test_package_not_modified(self, urls):
+        api = Binstar()
+        urls.register(method='GET', path='/package/u1/foo', content='{"name": "foo"}',
+                      headers={'ETag': '"abc"'})
+        self.assertEqual(api.package('u1', 'foo'), {'name': 'foo'})
+
+        not_modified = urls.register(method='GET', path='/package/u1/foo', status=304,
+                                     expected_headers={'If-None-Match': '"abc"'})
+        self.assertEqual(api.package('u1', 'foo'), {'name': 'foo'})
+        not_modified.assertCalled()
+
+    @urlpatch
+    def test_packages_not_modified_with_params(self, urls):
+        api = Binstar()
+        path = '/packages/u1?package_type=conda&package_type=pypi'
+        urls.register(method='GET', path=path, content='[]', headers={'ETag': '"abc"'})
+        api.user_packages('u1', package_type=['conda', 'pypi'])
+
+        not_modified = urls.register(method='GET', path=path, status=304,
+                                     expected_headers={'If-None-Match': '"abc"'})
+        self.assertEqual(api.user_packages('u1', package_type=['conda', 'pypi']), [])
+        not_modified.assertCalled()
+
+    @urlpatch
+    def test_etag_cache_is_bounded(self, urls):
+        api = Binstar()
+        for name in ('foo', 'bar', 'baz'):
+            urls.register(method='GET', path='/package/u1/%s' % name, content='{}',
+                          headers={'ETag': '"%s"' % name})
+
+        with patch('binstar_client.ETAG_CACHE_SIZE', 2):
+            for name in ('foo', 'bar', 'baz'):
+                api.package('u1', name)
+
+        self.assertEqual([etag for etag, _ in api._etag_cache.values()], ['"bar"', '"baz"'])
+        self.assertEqual(list(api._etag_cache.values())[-1], ('"baz"', b'{}'))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -2,6 +2,8 @@
 import io
 import unittest
 
+import requests
+
 from binstar_client import requests_ext
 
 
@@ -11,6 +13,18 @@ class TestMultiPart(unittest.TestCase):
         multipart = requests_ext.MultiPartIO([body])
         self.assertEqual(u'Unicode™'.encode('utf-8'), multipart.read())
 
+    def test_stream_multipart_content_length(self):
+        # S3 form uploads are rejected without a Content-Length
+        files = {'file': ('foo.txt', io.BytesIO(b'x' * 1000))}
+        data, headers = requests_ext.stream_multipart({'key': 'value'}, files=files)
+        request = requests.Request('POST', 'http://s3url.com/s3_url', data=data,
+                                   headers=headers).prepare()
+
+        body = request.body.read()
+        self.assertNotIn('Transfer-Encoding', request.headers)
+        self.assertEqual(request.headers['Content-Length'], str(len(body)))
+        self.assertIn(b'x' * 1000, body)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,94 @@
+import threading
+import time
+import unittest
+
+from requests.adapters import HTTPAdapter
+from six.moves import BaseHTTPServer
+
+from binstar_client.tests.urlmock import urlpatch
+from binstar_client import Binstar, POOL_SIZE
+
+
+class FlakyHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    '''Answer the first GET with a 503 asking to retry in an hour, then with a 200'''
+    requests_seen = 0
+
+    def do_GET(self):
+        FlakyHandler.requests_seen += 1
+        if FlakyHandler.requests_seen == 1:
+            self.send_response(503)
+            self.send_header('Retry-After', '3600')
+            body = b'{"error": "maintenance"}'
+        else:
+            self.send_response(200)
+            body = b'{"login": "eggs"}'
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Test(unittest.TestCase):
+    @urlpatch
+    def test_list_scopes_uses_session(self, urls):
+        api = Binstar('a-token')
+        scopes = urls.register(method='GET', path='/scopes', content='{"api": "access the api"}',
+                               expected_headers={'Authorization': 'token a-token'})
+
+        self.assertEqual(api.list_scopes(), {'api': 'access the api'})
+        scopes.assertCalled()
+
+    @urlpatch
+    def test_download_redirect_drops_custom_headers(self, urls):
+        api = Binstar('a-token', verify=False)
+        urls.register(method='GET', path='/download/u1/foo/0.1/foo-0.1.tar.bz2', status=302,
+                      headers={'Location': 'https://s3url.com/foo-0.1.tar.bz2'})
+        s3 = urls.register(method='GET', url='https://s3url.com/foo-0.1.tar.bz2', content=b'data')
+
+        res = api.download('u1', 'foo', '0.1', 'foo-0.1.tar.bz2')
+
+        self.assertEqual(res.content, b'data')
+        s3.assertCalled()
+        self.assertNotIn('Authorization', s3.req.headers)
+        self.assertNotIn('x-binstar-api-version', s3.req.headers)
+
+    def test_adapter_is_mounted(self):
+        api = Binstar()
+
+        for session in (api.session, api.storage_session):
+            for prefix in ('https://', 'http://'):
+                adapter = session.get_adapter(prefix + 'api.anaconda.org')
+                self.assertIsInstance(adapter, HTTPAdapter)
+                self.assertEqual(adapter._pool_maxsize, POOL_SIZE)
+                self.assertEqual(adapter.max_retries.total, 3)
+
+    def test_retry_on_service_unavailable(self):
+        FlakyHandler.requests_seen = 0
+        server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), FlakyHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        try:
+            api = Binstar(domain='http://127.0.0.1:%s' % server.server_port)
+            start = time.time()
+            self.assertEqual(api.user(), {'login': 'eggs'})
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(FlakyHandler.requests_seen, 2)
+        # The Retry-After of an hour is not honoured
+        self.assertLess(time.time() - start, 10)
+
+    def test_storage_session_always_verifies(self):
+        api = Binstar(verify=False)
+
+        self.assertIs(api.storage_session.verify, True)
+        self.assertIs(api.storage_session, api.storage_session)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,16 @@
 from __future__ import unicode_literals
 
+import io
+import os
+import shutil
+import tempfile
 import unittest
 
-from mock import patch
+from mock import Mock, patch
 
-from binstar_client import errors
+from binstar_client import Binstar, errors
+from binstar_client.utils import compute_hash
+from binstar_client.utils.projects.uploader import ProjectUploader
 from binstar_client.scripts.cli import main
 from binstar_client.tests.fixture import CLITestCase
 from binstar_client.tests.urlmock import urlpatch
@@ -230,5 +236,124 @@ class Test(CLITestCase):
             main(['--show-traceback', 'upload', '--private', data_dir('foo-0.1-0.tar.bz2')], False)
 
 
+class HashCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'foo-0.1-0.tar.bz2')
+        with open(self.filename, 'wb') as fd:
+            fd.write(b'content')
+
+        self.api = Binstar()
+        self.compute_hash_patch = patch('binstar_client.compute_hash', wraps=compute_hash)
+        self.compute_hash = self.compute_hash_patch.start()
+
+    def tearDown(self):
+        self.compute_hash_patch.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def hash_file(self):
+        with open(self.filename, 'rb') as fd:
+            return self.api._compute_hash(fd)
+
+    def test_unchanged_file_is_read_once(self):
+        first = self.hash_file()
+        second = self.hash_file()
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.compute_hash.call_count, 1)
+
+    def test_changed_size_invalidates(self):
+        first = self.hash_file()
+        with open(self.filename, 'ab') as fd:
+            fd.write(b' changed')
+        second = self.hash_file()
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.compute_hash.call_count, 2)
+
+    def test_changed_mtime_invalidates(self):
+        self.hash_file()
+        stat = os.stat(self.filename)
+        os.utime(self.filename, (stat.st_atime, stat.st_mtime + 10))
+        self.hash_file()
+
+        self.assertEqual(self.compute_hash.call_count, 2)
+
+    def test_unnamed_file_is_not_cached(self):
+        # Files opened from a descriptor have an integer `name`
+        with io.open(os.open(self.filename, os.O_RDONLY), 'rb') as fd:
+            first = self.api._compute_hash(fd)
+            second = self.api._compute_hash(fd)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.compute_hash.call_count, 2)
+        self.assertEqual(self.api._hash_cache, {})
+
+
+class S3UploadTest(unittest.TestCase):
+    def register_stage(self, registry):
+        content = {"post_url": "http://s3url.com/s3_url", "form_data": {}, "dist_id": "dist_id"}
+        registry.register(method='POST', path='/stage/eggs/foo/0.1/foo-0.1-0.tar.bz2',
+                          content=content)
+        registry.register(method='POST', path='/commit/eggs/foo/0.1/foo-0.1-0.tar.bz2',
+                          content={})
+
+    def upload(self, api):
+        return api.upload('eggs', 'foo', '0.1', 'foo-0.1-0.tar.bz2', io.BytesIO(b'data'), 'conda')
+
+    @urlpatch
+    def test_upload_streams_and_closes_response(self, registry):
+        self.register_stage(registry)
+        api = Binstar()
+        s3res = Mock(status_code=201)
+
+        with patch.object(api.storage_session, 'post', return_value=s3res) as post:
+            self.upload(api)
+
+        self.assertTrue(post.call_args[1]['stream'])
+        s3res.close.assert_called_once_with()
+        registry.assertAllCalled()
+
+    @urlpatch
+    def test_upload_error_is_logged(self, registry):
+        self.register_stage(registry)
+        api = Binstar()
+        s3res = Mock(status_code=400, text='error body')
+
+        with patch.object(api.storage_session, 'post', return_value=s3res), \
+                patch('binstar_client.logger') as logger:
+            with self.assertRaises(errors.BinstarError):
+                self.upload(api)
+
+        logger.info.assert_any_call('error body')
+        s3res.close.assert_called_once_with()
+
+    def project_uploader(self):
+        project = Mock(tar=io.BytesIO(b'data'), size=4, basename='project.tar')
+        return ProjectUploader('a-token', username='eggs', project=project)
+
+    def test_project_upload_streams_and_closes_response(self):
+        uploader = self.project_uploader()
+        s3res = Mock(status_code=201)
+
+        with patch.object(uploader.storage_session, 'post', return_value=s3res) as post:
+            self.assertIs(uploader.file_upload('http://s3url.com/s3_url', {'form_data': {}}), s3res)
+
+        self.assertTrue(post.call_args[1]['stream'])
+        s3res.close.assert_called_once_with()
+
+    def test_project_upload_error_is_logged(self):
+        uploader = self.project_uploader()
+        s3res = Mock(status_code=400, text='error body')
+
+        with patch.object(uploader.storage_session, 'post', return_value=s3res), \
+                patch('binstar_client.utils.projects.uploader.logger') as logger:
+            with self.assertRaises(errors.BinstarError):
+                uploader.file_upload('http://s3url.com/s3_url', {'form_data': {}})
+
+        logger.info.assert_called_once_with('error body')
+        s3res.close.assert_called_once_with()
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,14 +1,21 @@
 from __future__ import print_function, absolute_import, unicode_literals
 
 import base64
+import io
 import json
 import logging
+import mmap
 import os
 import sys
 import time
 
 from hashlib import md5
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # re-export parse_version
 from pkg_resources import parse_version as pv
 from .spec import PackageSpec, package_specs, parse_specs
@@ -19,43 +26,116 @@ from .config import (get_server_api, dirs, load_token, store_token,
                      get_binstar,
                      USER_CONFIG, USER_LOGDIR, SITE_CONFIG, DEFAULT_CONFIG)
 
-from six.moves import input
+from six.moves import builtins, input
 
 
 logger = logging.getLogger('binstar')
 
+# `file` is the type returned by `open` on Python 2
+_DISK_FILE_TYPES = (io.FileIO, getattr(builtins, 'file', io.FileIO))
+
 
 def jencode(*E, **F):
     payload = dict(*E, **F)
-    return json.dumps(payload), {'Content-Type': 'application/json'}
-
-
-def compute_hash(fp, buf_size=8192, size=None, hash_algorithm=md5):
-    hash_obj = hash_algorithm()
-    spos = fp.tell()
-    if size and size < buf_size:
-        s = fp.read(size)
+    if orjson is not None:
+        data = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
     else:
-        s = fp.read(buf_size)
-    while s:
-        hash_obj.update(s)
-        if size:
-            size -= len(s)
-            if size <= 0:
-                break
+        data = json.dumps(payload)
+    return data, {'Content-Type': 'application/json'}
+
+
+def jloads(content):
+    """
+    Decode the json document in the bytes `content`
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content.decode('utf-8'))
+
+
+def jdecode(res):
+    """
+    Decode the json body of the response `res`
+    """
+    if orjson is not None:
+        return orjson.loads(res.content)
+    return res.json()
+
+
+def _is_disk_file(fp):
+    """
+    Whether `fp` reads straight from a file on disk. Objects such as
+    `SpooledTemporaryFile` also have a `fileno`, but calling it writes their
+    in-memory contents to disk.
+    """
+    return (isinstance(fp, _DISK_FILE_TYPES) or
+            isinstance(getattr(fp, 'raw', None), _DISK_FILE_TYPES))
+
+
+def _mmap_hash(fp, size, hash_algorithm):
+    """
+    Hash the file behind `fp` through a memory map, without copying its
+    contents through python buffers. Returns None if `fp` can not be mapped.
+    """
+    if not _is_disk_file(fp):
+        return None
+
+    try:
+        mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    except (EnvironmentError, ValueError, OverflowError, io.UnsupportedOperation):
+        return None
+
+    try:
+        # Python 2 mmaps do not support memoryview
+        view = memoryview(mm)
+    except TypeError:
+        mm.close()
+        return None
+
+    try:
+        spos = fp.tell()
+        # Like the read loop, a falsy size means read to the end of the file
+        end = len(mm) if not size else min(len(mm), spos + size)
+        hash_obj = hash_algorithm()
+        chunk = view[spos:end]
+        try:
+            hash_obj.update(chunk)
+        finally:
+            chunk.release()
+    finally:
+        view.release()
+        mm.close()
+
+    return hash_obj, max(end - spos, 0)
+
+
+def compute_hash(fp, buf_size=1 << 20, size=None, hash_algorithm=md5):
+    result = _mmap_hash(fp, size, hash_algorithm)
+    if result is not None:
+        hash_obj, data_size = result
+    else:
+        hash_obj = hash_algorithm()
+        spos = fp.tell()
         if size and size < buf_size:
             s = fp.read(size)
         else:
             s = fp.read(buf_size)
-    hex_digest = hash_obj.hexdigest()
+        while s:
+            hash_obj.update(s)
+            if size:
+                size -= len(s)
+                if size <= 0:
+                    break
+            if size and size < buf_size:
+                s = fp.read(size)
+            else:
+                s = fp.read(buf_size)
+        # data_size based on bytes read.
+        data_size = fp.tell() - spos
+        fp.seek(spos)
 
-    b64encode = getattr(base64, 'encodebytes', base64.encodestring)
-    base64_digest = b64encode(hash_obj.digest())
-    if base64_digest[-1] == '\n':
-        base64_digest = base64_digest[0:-1]
-    # data_size based on bytes read.
-    data_size = fp.tell() - spos
-    fp.seek(spos)
+    hex_digest = hash_obj.hexdigest()
+    base64_digest = base64.b64encode(hash_obj.digest())
     return (hex_digest, base64_digest, data_size)
 
 
@@ -1,8 +1,10 @@
+import logging
 from tempfile import SpooledTemporaryFile
-import requests
 import binstar_client
 from binstar_client.requests_ext import stream_multipart
-from binstar_client.utils import compute_hash, jencode
+from binstar_client.utils import compute_hash, jdecode, jencode
+
+logger = logging.getLogger('binstar.projects.upload')
 
 
 class ProjectUploader(binstar_client.Binstar):
@@ -40,7 +42,7 @@ class ProjectUploader(binstar_client.Binstar):
         )
         data, headers = jencode({})
         res = self.session.post(url, data=data, headers=headers)
-        self._check_response(res, [201])
+        self._check_response(res, (201,))
         return res
 
     def file_upload(self, url, obj):
@@ -54,16 +56,21 @@ class ProjectUploader(binstar_client.Binstar):
         data_stream, headers = stream_multipart(
             s3data, files={'file': (self.project.basename, self.project.tar)})
 
-        s3res = requests.post(
+        s3res = self.storage_session.post(
             url,
             data=data_stream,
+            stream=True,
             verify=self.session.verify,
             timeout=10 * 60 * 60,
             headers=headers)
 
-        if s3res.status_code != 201:
-            raise binstar_client.errors.BinstarError(
-                'Error uploading package', s3res.status_code)
+        try:
+            if s3res.status_code != 201:
+                logger.info(s3res.text)
+                raise binstar_client.errors.BinstarError(
+                    'Error uploading package', s3res.status_code)
+        finally:
+            s3res.close()
         return s3res
 
     def projects(self):
@@ -82,8 +89,8 @@ class ProjectUploader(binstar_client.Binstar):
         if not self.exists():
             self.create()
 
-        data = self.stage().json()
+        data = jdecode(self.stage())
         self.file_upload(data['post_url'], data)
         res = self.commit(data['dist_id'])
-        data = res.json()
+        data = jdecode(res)
         return data
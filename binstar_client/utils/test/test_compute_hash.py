@@ -0,0 +1,87 @@
+import io
+import tempfile
+import unittest
+
+from mock import patch
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from binstar_client.utils import compute_hash
+
+
+class ComputeHashTestCase(unittest.TestCase):
+    content = b'anaconda-client' * 1000
+
+    def test_file_matches_stream(self):
+        with tempfile.TemporaryFile() as fd:
+            fd.write(self.content)
+            fd.seek(10)
+
+            self.assertEqual(compute_hash(fd), compute_hash(io.BytesIO(self.content[10:])))
+            self.assertEqual(fd.tell(), 10)
+
+    def test_file_with_size(self):
+        with tempfile.TemporaryFile() as fd:
+            fd.write(self.content)
+            fd.seek(0)
+
+            _, _, size = compute_hash(fd, size=100)
+            self.assertEqual(size, 100)
+            expected = compute_hash(io.BytesIO(self.content), size=100)
+            self.assertEqual(compute_hash(fd, size=100), expected)
+
+    def test_file_with_zero_size(self):
+        with tempfile.TemporaryFile() as fd:
+            fd.write(self.content)
+            fd.seek(0)
+
+            expected = compute_hash(io.BytesIO(self.content), size=0)
+            self.assertEqual(compute_hash(fd, size=0), expected)
+            self.assertEqual(expected[2], len(self.content))
+
+    def test_empty_file(self):
+        with tempfile.TemporaryFile() as fd:
+            self.assertEqual(compute_hash(fd), compute_hash(io.BytesIO()))
+
+    def test_spooled_file_is_not_rolled_over(self):
+        fd = tempfile.SpooledTemporaryFile(max_size=0)
+        fd.write(self.content)
+        fd.seek(0)
+
+        expected = compute_hash(io.BytesIO(self.content), size=100)
+        self.assertEqual(compute_hash(fd, size=100), expected)
+        self.assertFalse(fd._rolled)
+
+    @unittest.skipIf(tracemalloc is None, 'tracemalloc is not available')
+    def test_file_from_offset_is_not_copied(self):
+        content = b'x' * (4 << 20)
+        with tempfile.TemporaryFile() as fd:
+            fd.write(content)
+            fd.seek(1)
+
+            tracemalloc.start()
+            try:
+                result = compute_hash(fd)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+            self.assertLess(peak, 1 << 20)
+            self.assertEqual(result, compute_hash(io.BytesIO(content[1:])))
+
+    def test_file_too_large_to_map(self):
+        with tempfile.TemporaryFile() as fd:
+            fd.write(self.content)
+            fd.seek(0)
+
+            with patch('mmap.mmap', side_effect=OverflowError):
+                result = compute_hash(fd)
+
+            self.assertEqual(result, compute_hash(io.BytesIO(self.content)))
+
+
+if __name__ == '__main__':
+    unittest.main()